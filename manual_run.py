@@ -6,6 +6,7 @@ Use this to manually check for violations without waiting for the scheduled run
 
 import sys
 import argparse
+import functools
 from violation_monitor import ViolationMonitor
 import logging
 
@@ -13,15 +14,26 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
-    """Manual run with optional parameters"""
+def _digits(value: str) -> str:
+    """argparse type: strip whitespace and require a plain digit string"""
+    value = value.strip()
+    if not value.isdigit():
+        raise argparse.ArgumentTypeError(f"expected digits, got {value!r}")
+    return value
+
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser once, even if main() is called repeatedly"""
     parser = argparse.ArgumentParser(description='Manually run NYC Property Violation Monitor')
-    parser.add_argument('--block', help='Override block number from config')
-    parser.add_argument('--lot', help='Override lot number from config')
+    parser.add_argument('--block', type=_digits, help='Override block number from config')
+    parser.add_argument('--lot', type=_digits, help='Override lot number from config')
     parser.add_argument('--no-email', action='store_true', help='Skip sending email notification')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
-    
-    args = parser.parse_args()
+    return parser
+
+def main():
+    """Manual run with optional parameters"""
+    args = _build_parser().parse_args()
     
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
@@ -4,10 +4,10 @@ Scheduler for NYC Property Violation Monitor
 Runs the violation monitor on a daily schedule
 """
 
-import schedule
 import time
 import logging
-from violation_monitor import ViolationMonitor
+from datetime import datetime, timedelta
+from violation_monitor import ViolationMonitor, load_config
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,15 +25,20 @@ def run_violation_check():
 
 def main():
     """Main scheduler function"""
-    # Schedule the job to run daily at 9:00 AM
-    schedule.every().day.at("09:00").do(run_violation_check)
-    
-    logger.info("Violation monitor scheduler started - will run daily at 9:00 AM")
-    
-    # Keep the script running
+    # Run daily at the configured time (default 9:00 AM)
+    run_at = load_config().get('schedule', {}).get('time', '09:00')
+    hour, minute = (int(part) for part in run_at.split(':'))
+
+    logger.info(f"Violation monitor scheduler started - will run daily at {run_at}")
+
+    # Sleep straight through to the next run instead of waking every minute
     while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        time.sleep((next_run - now).total_seconds())
+        run_violation_check()
 
 if __name__ == "__main__":
     main()
@@ -21,6 +21,11 @@ def install_dependencies():
         return False
     return True
 
+def prompt(label, default, cast=str):
+    """Prompt for a value, keeping the default when input is empty"""
+    value = input(f"{label} [{default}]: ").strip()
+    return cast(value) if value else default
+
 def setup_config():
     """Create config.json from template if it doesn't exist"""
     if os.path.exists('config.json'):
@@ -40,27 +45,14 @@ def setup_config():
         print("\nLet's configure your monitoring setup:")
         
         # Property configuration
-        block = input(f"Enter Block number [{config['property']['block']}]: ").strip()
-        if block:
-            config['property']['block'] = block
-        
-        lot = input(f"Enter Lot number [{config['property']['lot']}]: ").strip()
-        if lot:
-            config['property']['lot'] = lot
-        
+        config['property']['block'] = prompt('Enter Block number', config['property']['block'])
+        config['property']['lot'] = prompt('Enter Lot number', config['property']['lot'])
+
         # Email configuration
         print("\nEmail Configuration:")
-        from_email = input(f"From email address [{config['email']['from_email']}]: ").strip()
-        if from_email:
-            config['email']['from_email'] = from_email
-        
-        smtp_server = input(f"SMTP server [{config['email']['smtp_server']}]: ").strip()
-        if smtp_server:
-            config['email']['smtp_server'] = smtp_server
-        
-        smtp_port = input(f"SMTP port [{config['email']['smtp_port']}]: ").strip()
-        if smtp_port:
-            config['email']['smtp_port'] = int(smtp_port)
+        config['email']['from_email'] = prompt('From email address', config['email']['from_email'])
+        config['email']['smtp_server'] = prompt('SMTP server', config['email']['smtp_server'])
+        config['email']['smtp_port'] = prompt('SMTP port', config['email']['smtp_port'], cast=int)
         
         # Get recipient emails
         to_emails = []
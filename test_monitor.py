@@ -4,9 +4,9 @@ Test script for NYC Property Violation Monitor
 Use this to test the system before setting up daily monitoring
 """
 
-import json
+import asyncio
 import sys
-from violation_monitor import ViolationMonitor, NYCDataFetcher
+from violation_monitor import ViolationMonitor, NYCDataFetcher, load_config
 from datetime import datetime, timedelta
 
 def test_api_connectivity():
@@ -25,9 +25,15 @@ def test_api_connectivity():
         'DOB Violations': '3h2n-5cm9'
     }
     
+    async def fetch_one(dataset_id):
+        try:
+            return await fetcher._make_request(dataset_id, dict(test_params))
+        finally:
+            await fetcher.close()
+
     for name, dataset_id in datasets.items():
         try:
-            result = fetcher._make_request(dataset_id, test_params)
+            result = asyncio.run(fetch_one(dataset_id))
             if result:
                 print(f"✓ {name}: Connected successfully")
             else:
@@ -46,10 +52,16 @@ def test_property_data(block: str, lot: str):
     
     # Test each data source
     print(f"Looking for violations since {since_date}")
-    
+
+    async def fetch(method):
+        try:
+            return await method(block, lot, since_date)
+        finally:
+            await fetcher.close()
+
     # 311 Complaints
     try:
-        complaints = fetcher.get_311_complaints(block, lot, since_date)
+        complaints = asyncio.run(fetch(fetcher.get_311_complaints))
         print(f"✓ 311 Complaints: {len(complaints)} found")
         if complaints:
             print(f"  Latest: {complaints[0].get('created_date', 'N/A')} - {complaints[0].get('complaint_type', 'N/A')}")
@@ -58,7 +70,7 @@ def test_property_data(block: str, lot: str):
     
     # HPD Violations
     try:
-        hpd_violations = fetcher.get_hpd_violations(block, lot, since_date)
+        hpd_violations = asyncio.run(fetch(fetcher.get_hpd_violations))
         print(f"✓ HPD Violations: {len(hpd_violations)} found")
         if hpd_violations:
             print(f"  Latest: {hpd_violations[0].get('inspectiondate', 'N/A')} - {hpd_violations[0].get('violationtype', 'N/A')}")
@@ -67,7 +79,7 @@ def test_property_data(block: str, lot: str):
     
     # OATH Violations
     try:
-        oath_violations = fetcher.get_oath_violations(block, lot, since_date)
+        oath_violations = asyncio.run(fetch(fetcher.get_oath_violations))
         print(f"✓ OATH Violations: {len(oath_violations)} found")
         if oath_violations:
             print(f"  Latest: {oath_violations[0].get('hearing_date', 'N/A')} - {oath_violations[0].get('violation_type', 'N/A')}")
@@ -76,7 +88,7 @@ def test_property_data(block: str, lot: str):
     
     # DOB Violations
     try:
-        dob_violations = fetcher.get_dob_violations(block, lot, since_date)
+        dob_violations = asyncio.run(fetch(fetcher.get_dob_violations))
         print(f"✓ DOB Violations: {len(dob_violations)} found")
         if dob_violations:
             print(f"  Latest: {dob_violations[0].get('issue_date', 'N/A')} - {dob_violations[0].get('violation_type_code', 'N/A')}")
@@ -88,9 +100,8 @@ def test_email_config():
     print("\nTesting email configuration...")
     
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-        
+        config = load_config()
+
         email_config = config.get('email', {})
         required_fields = ['smtp_server', 'smtp_port', 'from_email', 'from_password', 'to_emails']
         
@@ -108,7 +119,7 @@ def test_email_config():
             
     except FileNotFoundError:
         print("✗ config.json not found. Please copy config.json.example to config.json and configure it.")
-    except json.JSONDecodeError:
+    except ValueError:
         print("✗ config.json is not valid JSON")
     except Exception as e:
         print(f"✗ Error reading config: {e}")
@@ -147,8 +158,7 @@ def main():
     
     # Test with property from config if available
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = load_config()
         block = config['property']['block']
         lot = config['property']['lot']
         test_property_data(block, lot)
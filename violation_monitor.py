@@ -5,14 +5,16 @@ Monitors NYC Open Data for new violations at a specific property
 and sends daily email alerts.
 """
 
-import json
-import requests
+import asyncio
+import functools
+import pickle
+import re
 import smtplib
-import sqlite3
 import os
+import httpx
+import orjson
 from datetime import datetime, timedelta
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.message import EmailMessage
 from typing import List, Dict, Any
 import logging
 
@@ -20,13 +22,92 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
+def load_config(config_path: str = 'config.json') -> Dict:
+    """Load config.json once and cache the parsed result"""
+    with open(config_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+# Column headers and the record keys rendered for each violation source
+SCHEMAS = {
+    '311_complaints': (['Date', 'Type', 'Description', 'Address'],
+                       ['created_date', 'complaint_type', 'descriptor', 'incident_address']),
+    'hpd_violations': (['Date', 'Type', 'Description', 'Class'],
+                       ['inspectiondate', 'violationtype', 'violationdescription', 'class']),
+    'oath_violations': (['Hearing Date', 'Violation', 'Status'],
+                        ['hearing_date', 'violation_type', 'status']),
+    'dob_violations': (['Issue Date', 'Type', 'Description', 'Severity'],
+                       ['issue_date', 'violation_type_code', 'description', 'severity'])
+}
+
+# Static report shell, built once at import
+_HTML_PREAMBLE = """
+        <html>
+        <head>
+            <style>
+                table {border-collapse: collapse; width: 100%;}
+                th, td {border: 1px solid #ddd; padding: 8px; text-align: left;}
+                th {background-color: #f2f2f2;}
+                .section {margin-bottom: 20px;}
+                .no-violations {color: #666; font-style: italic;}
+            </style>
+        </head>
+        <body>
+            <h2>NYC Property Violations Report</h2>
+        """
+_HTML_POSTAMBLE = "</body></html>"
+
+# Header rows pre-rendered once at import
+_HEADER_ROWS = {
+    source: '<tr>' + ''.join(f'<th>{h}</th>' for h in headers) + '</tr>'
+    for source, (headers, _) in SCHEMAS.items()
+}
+
+# Primary-key field used to dedup each source
+ID_FIELDS = {
+    '311_complaints': 'unique_key',
+    'hpd_violations': 'violationid',
+    'oath_violations': 'summons_number',
+    'dob_violations': 'isn_dob_bis_viol'
+}
+
+# NYCDataFetcher method that serves each source
+FETCHERS = {
+    '311_complaints': 'get_311_complaints',
+    'hpd_violations': 'get_hpd_violations',
+    'oath_violations': 'get_oath_violations',
+    'dob_violations': 'get_dob_violations'
+}
+
+# $select projections: the tracking ID plus the columns the report renders
+_SELECT_FIELDS = {
+    source: ','.join([ID_FIELDS[source]] + keys)
+    for source, (_, keys) in SCHEMAS.items()
+}
+
+# Refuse to buffer pathologically large API responses
+_MAX_RESPONSE_BYTES = 50 * 1024 * 1024
+
+def _canonicalize(value: str, name: str) -> str:
+    """Validate a block/lot/borough value and strip whitespace and leading zeros
+
+    Canonical values keep the query strings stable across runs so the
+    Socrata CDN can reuse cached results, and reject anything that would
+    break out of the SoQL literal.
+    """
+    value = str(value).strip()
+    if not re.fullmatch(r'\d+', value):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return str(int(value))
+
 class NYCDataFetcher:
     """Handles fetching data from NYC Open Data APIs"""
     
     def __init__(self, api_token=None):
         self.api_token = api_token
         self.base_url = "https://data.cityofnewyork.us/resource"
-        
+        self.session = None
+
         # NYC Open Data dataset IDs
         self.datasets = {
             '311_complaints': '311-service-requests',  # erm2-nwe9.json
@@ -35,114 +116,170 @@ class NYCDataFetcher:
             'dob_violations': 'dob-violations'  # 3h2n-5cm9.json
         }
         
-    def _make_request(self, endpoint: str, params: Dict[str, Any]) -> List[Dict]:
+    async def _get_session(self) -> 'httpx.AsyncClient':
+        """Get or create the shared HTTP client"""
+        if self.session is None or self.session.is_closed:
+            self.session = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=8),
+                timeout=30,
+                headers={'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+            )
+        return self.session
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self.session is not None and not self.session.is_closed:
+            await self.session.aclose()
+        self.session = None
+
+    async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> List[Dict]:
         """Make API request to NYC Open Data"""
         url = f"{self.base_url}/{endpoint}.json"
-        
+
         if self.api_token:
             params['$$app_token'] = self.api_token
-            
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {endpoint}: {e}")
-            return []
-    
-    def get_311_complaints(self, block: str, lot: str, since_date: str) -> List[Dict]:
+
+        # Retry transient failures with exponential backoff
+        last_error = None
+        for attempt in range(3):
+            if attempt:
+                await asyncio.sleep(0.5 * (2 ** (attempt - 1)))
+            try:
+                session = await self._get_session()
+                async with session.stream('GET', url, params=params) as response:
+                    if response.status_code in (429, 500, 502, 503, 504):
+                        last_error = f"HTTP {response.status_code}"
+                        continue
+                    response.raise_for_status()
+
+                    declared = response.headers.get('Content-Length')
+                    if declared and int(declared) > _MAX_RESPONSE_BYTES:
+                        logger.error(
+                            f"Response from {endpoint} too large: {declared} bytes")
+                        return []
+
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) > _MAX_RESPONSE_BYTES:
+                            logger.error(
+                                f"Response from {endpoint} exceeded "
+                                f"{_MAX_RESPONSE_BYTES} bytes")
+                            return []
+                    return orjson.loads(bytes(body))
+            except httpx.HTTPError as e:
+                last_error = e
+
+        logger.error(f"Error fetching {endpoint}: {last_error}")
+        return []
+
+    async def get_311_complaints(self, block: str, lot: str, since_date: str,
+                                 borough: str = '1') -> List[Dict]:
         """Fetch 311 complaints for a property"""
+        block = _canonicalize(block, 'block')
+        lot = _canonicalize(lot, 'lot')
+        borough = _canonicalize(borough, 'borough')
+        # Query on the indexed BBL composite (borough + 5-digit block + 4-digit lot)
+        bbl = f"{borough}{int(block):05d}{int(lot):04d}"
         params = {
-            '$where': f"incident_address LIKE '%{block} %{lot}%' AND created_date > '{since_date}'",
+            '$select': _SELECT_FIELDS['311_complaints'],
+            '$where': f"bbl = '{bbl}' AND created_date > '{since_date}'",
             '$order': 'created_date DESC',
-            '$limit': 1000
+            '$limit': '1000'
         }
-        return self._make_request('erm2-nwe9', params)
-    
-    def get_hpd_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
+        return await self._make_request('erm2-nwe9', params)
+
+    async def get_hpd_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
         """Fetch HPD violations for a property"""
+        block = _canonicalize(block, 'block')
+        lot = _canonicalize(lot, 'lot')
         params = {
+            '$select': _SELECT_FIELDS['hpd_violations'],
             '$where': f"block = '{block}' AND lot = '{lot}' AND inspectiondate > '{since_date}'",
             '$order': 'inspectiondate DESC',
-            '$limit': 1000
+            '$limit': '1000'
         }
-        return self._make_request('wvxf-dwi5', params)
-    
-    def get_oath_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
+        return await self._make_request('wvxf-dwi5', params)
+
+    async def get_oath_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
         """Fetch OATH violations for a property"""
+        block = _canonicalize(block, 'block')
+        lot = _canonicalize(lot, 'lot')
         params = {
+            '$select': _SELECT_FIELDS['oath_violations'],
             '$where': f"block = '{block}' AND lot = '{lot}' AND hearing_date > '{since_date}'",
             '$order': 'hearing_date DESC',
-            '$limit': 1000
+            '$limit': '1000'
         }
-        return self._make_request('6bgk-3dad', params)
-    
-    def get_dob_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
+        return await self._make_request('6bgk-3dad', params)
+
+    async def get_dob_violations(self, block: str, lot: str, since_date: str) -> List[Dict]:
         """Fetch DOB violations for a property"""
+        block = _canonicalize(block, 'block')
+        lot = _canonicalize(lot, 'lot')
         params = {
+            '$select': _SELECT_FIELDS['dob_violations'],
             '$where': f"block = '{block}' AND lot = '{lot}' AND issue_date > '{since_date}'",
             '$order': 'issue_date DESC',
-            '$limit': 1000
+            '$limit': '1000'
         }
-        return self._make_request('3h2n-5cm9', params)
+        return await self._make_request('3h2n-5cm9', params)
 
 class ViolationTracker:
     """Handles tracking violations to identify new ones"""
     
     def __init__(self):
-        self.db_path = 'violations.db'
-        self._init_database()
-    
-    def _init_database(self):
-        """Initialize SQLite database for tracking violations"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS violations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source TEXT NOT NULL,
-                violation_id TEXT NOT NULL,
-                block TEXT NOT NULL,
-                lot TEXT NOT NULL,
-                violation_date TEXT NOT NULL,
-                created_date TEXT NOT NULL,
-                UNIQUE(source, violation_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
+        self.snapshot_path = 'seen.pkl'
+        self.log_path = 'seen.log'
+        self.seen = self._load()
+
+    def _load(self) -> set:
+        """Load the snapshot, then replay additions logged since it was written"""
+        seen = set()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as f:
+                seen = pickle.load(f)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r') as f:
+                for line in f:
+                    source, _, violation_id = line.rstrip('\n').partition('\t')
+                    if violation_id:
+                        seen.add((source, violation_id))
+        return seen
+
     def is_new_violation(self, source: str, violation_id: str) -> bool:
         """Check if a violation is new"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'SELECT 1 FROM violations WHERE source = ? AND violation_id = ?',
-            (source, violation_id)
-        )
-        
-        result = cursor.fetchone() is None
-        conn.close()
-        return result
-    
-    def track_violation(self, source: str, violation_id: str, block: str, 
+        return (source, violation_id) not in self.seen
+
+    def is_new_violations_bulk(self, source: str, violation_ids: List[str]) -> set:
+        """Return the subset of violation_ids already tracked for a source"""
+        return {v for v in violation_ids if (source, v) in self.seen}
+
+    def track_violations_bulk(self, source: str, violation_ids: List[str]):
+        """Track many new violations, logging them for crash safety"""
+        violation_ids = [v for v in violation_ids
+                         if (source, v) not in self.seen]
+        if not violation_ids:
+            return
+        with open(self.log_path, 'a') as f:
+            for violation_id in violation_ids:
+                f.write(f"{source}\t{violation_id}\n")
+        self.seen.update((source, v) for v in violation_ids)
+
+    def track_violation(self, source: str, violation_id: str, block: str,
                        lot: str, violation_date: str):
         """Track a new violation"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR IGNORE INTO violations 
-            (source, violation_id, block, lot, violation_date, created_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (source, violation_id, block, lot, violation_date, 
-              datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        self.track_violations_bulk(source, [violation_id])
+
+    def flush(self):
+        """Atomically rewrite the snapshot and truncate the replay log"""
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.seen, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.snapshot_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
 
 class EmailNotifier:
     """Handles sending email notifications"""
@@ -160,98 +297,58 @@ class EmailNotifier:
             logger.info("No new violations to report")
             return
         
-        msg = MimeMultipart()
+        msg = EmailMessage()
         msg['From'] = self.from_email
         msg['To'] = ', '.join(self.to_emails)
         msg['Subject'] = f"NYC Property Violations - Block {block}, Lot {lot}"
-        
+
         # Create email body
         body = self._create_email_body(violations, block, lot)
-        msg.attach(MimeText(body, 'html'))
-        
-        # Send email
+        msg.set_content("This report requires an HTML-capable email client.")
+        msg.add_alternative(body, subtype='html')
+
+        # Send email: one envelope with all recipients
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.from_email, self.from_password)
-            
-            for to_email in self.to_emails:
-                server.sendmail(self.from_email, to_email, msg.as_string())
-            
-            server.quit()
+            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+                server.starttls()
+                server.login(self.from_email, self.from_password)
+                server.send_message(msg)
+
             logger.info(f"Report sent to {len(self.to_emails)} recipients")
-            
+
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
     
     def _create_email_body(self, violations: Dict[str, List], block: str, lot: str) -> str:
         """Create HTML email body"""
-        html = f"""
-        <html>
-        <head>
-            <style>
-                table {{border-collapse: collapse; width: 100%;}}
-                th, td {{border: 1px solid #ddd; padding: 8px; text-align: left;}}
-                th {{background-color: #f2f2f2;}}
-                .section {{margin-bottom: 20px;}}
-                .no-violations {{color: #666; font-style: italic;}}
-            </style>
-        </head>
-        <body>
-            <h2>NYC Property Violations Report</h2>
-            <p><strong>Property:</strong> Block {block}, Lot {lot}</p>
-            <p><strong>Date:</strong> {datetime.now().strftime('%Y-%m-%d')}</p>
-        """
-        
+        parts = [
+            _HTML_PREAMBLE,
+            f"<p><strong>Property:</strong> Block {block}, Lot {lot}</p>"
+            f"<p><strong>Date:</strong> {datetime.now().strftime('%Y-%m-%d')}</p>"
+        ]
+
         for source, viol_list in violations.items():
+            parts.append(f"<div class='section'><h3>{source.replace('_', ' ').title()}</h3>")
             if viol_list:
-                html += f"<div class='section'><h3>{source.replace('_', ' ').title()}</h3>"
-                html += "<table><tr>"
-                
-                # Add headers based on violation type
-                if source == '311_complaints':
-                    html += "<th>Date</th><th>Type</th><th>Description</th><th>Address</th></tr>"
-                    for viol in viol_list:
-                        html += f"<tr><td>{viol.get('created_date', '')}</td>"
-                        html += f"<td>{viol.get('complaint_type', '')}</td>"
-                        html += f"<td>{viol.get('descriptor', '')}</td>"
-                        html += f"<td>{viol.get('incident_address', '')}</td></tr>"
-                elif source == 'hpd_violations':
-                    html += "<th>Date</th><th>Type</th><th>Description</th><th>Class</th></tr>"
-                    for viol in viol_list:
-                        html += f"<tr><td>{viol.get('inspectiondate', '')}</td>"
-                        html += f"<td>{viol.get('violationtype', '')}</td>"
-                        html += f"<td>{viol.get('violationdescription', '')}</td>"
-                        html += f"<td>{viol.get('class', '')}</td></tr>"
-                elif source == 'oath_violations':
-                    html += "<th>Hearing Date</th><th>Violation</th><th>Status</th></tr>"
-                    for viol in viol_list:
-                        html += f"<tr><td>{viol.get('hearing_date', '')}</td>"
-                        html += f"<td>{viol.get('violation_type', '')}</td>"
-                        html += f"<td>{viol.get('status', '')}</td></tr>"
-                elif source == 'dob_violations':
-                    html += "<th>Issue Date</th><th>Type</th><th>Description</th><th>Severity</th></tr>"
-                    for viol in viol_list:
-                        html += f"<tr><td>{viol.get('issue_date', '')}</td>"
-                        html += f"<td>{viol.get('violation_type_code', '')}</td>"
-                        html += f"<td>{viol.get('description', '')}</td>"
-                        html += f"<td>{viol.get('severity', '')}</td></tr>"
-                
-                html += "</table></div>"
+                _, keys = SCHEMAS[source]
+                parts.append("<table>")
+                parts.append(_HEADER_ROWS[source])
+                for viol in viol_list:
+                    parts.append(
+                        '<tr>' + ''.join(f"<td>{viol.get(k, '')}</td>" for k in keys) + '</tr>')
+                parts.append("</table></div>")
             else:
-                html += f"<div class='section'><h3>{source.replace('_', ' ').title()}</h3>"
-                html += "<p class='no-violations'>No new violations found</p></div>"
-        
-        html += "</body></html>"
-        return html
+                parts.append("<p class='no-violations'>No new violations found</p></div>")
+
+        parts.append(_HTML_POSTAMBLE)
+        return ''.join(parts)
 
 class ViolationMonitor:
     """Main class that orchestrates the violation monitoring"""
     
     def __init__(self, config_path: str = 'config.json'):
-        with open(config_path, 'r') as f:
-            self.config = json.load(f)
-        
+        self.config = load_config(config_path)
+
         self.data_fetcher = NYCDataFetcher(
             self.config.get('nyc_data', {}).get('api_tokens', {}).get('socrata_token')
         )
@@ -260,65 +357,49 @@ class ViolationMonitor:
         
         self.block = self.config['property']['block']
         self.lot = self.config['property']['lot']
+        self.borough = self.config['property'].get('borough', '1')
     
+    async def _check_source(self, source: str, fetch) -> List[Dict]:
+        """Dedup one source's rows as soon as its response lands
+
+        The tracker calls are synchronous and run inside the event loop,
+        so dedup for one source overlaps with the other sources' HTTP
+        requests still in flight.
+        """
+        id_field = ID_FIELDS[source]
+        candidates = [r for r in await fetch if r.get(id_field)]
+        existing = self.tracker.is_new_violations_bulk(
+            source, [r[id_field] for r in candidates])
+        new = [r for r in candidates if r[id_field] not in existing]
+        self.tracker.track_violations_bulk(source, [r[id_field] for r in new])
+        return new
+
+    async def _check_all(self, since_date: str) -> Dict[str, List]:
+        """Fetch and dedup all four sources concurrently"""
+        fetcher = self.data_fetcher
+        checks = []
+        for source, method_name in FETCHERS.items():
+            args = [self.block, self.lot, since_date]
+            if source == '311_complaints':
+                args.append(self.borough)
+            checks.append(self._check_source(
+                source, getattr(fetcher, method_name)(*args)))
+        try:
+            results = await asyncio.gather(*checks)
+        finally:
+            await fetcher.close()
+        return dict(zip(FETCHERS, results))
+
     def check_violations(self):
         """Check for new violations and send email if found"""
         logger.info(f"Checking violations for Block {self.block}, Lot {self.lot}")
-        
+
         # Get yesterday's date as starting point
         yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        new_violations = {
-            '311_complaints': [],
-            'hpd_violations': [],
-            'oath_violations': [],
-            'dob_violations': []
-        }
-        
-        # Check 311 complaints
-        complaints = self.data_fetcher.get_311_complaints(self.block, self.lot, yesterday)
-        for complaint in complaints:
-            complaint_id = complaint.get('unique_key')
-            if complaint_id and self.tracker.is_new_violation('311_complaints', complaint_id):
-                new_violations['311_complaints'].append(complaint)
-                self.tracker.track_violation(
-                    '311_complaints', complaint_id, self.block, self.lot,
-                    complaint.get('created_date')
-                )
-        
-        # Check HPD violations
-        hpd_violations = self.data_fetcher.get_hpd_violations(self.block, self.lot, yesterday)
-        for violation in hpd_violations:
-            violation_id = violation.get('violationid')
-            if violation_id and self.tracker.is_new_violation('hpd_violations', violation_id):
-                new_violations['hpd_violations'].append(violation)
-                self.tracker.track_violation(
-                    'hpd_violations', violation_id, self.block, self.lot,
-                    violation.get('inspectiondate')
-                )
-        
-        # Check OATH violations
-        oath_violations = self.data_fetcher.get_oath_violations(self.block, self.lot, yesterday)
-        for violation in oath_violations:
-            violation_id = violation.get('summons_number')
-            if violation_id and self.tracker.is_new_violation('oath_violations', violation_id):
-                new_violations['oath_violations'].append(violation)
-                self.tracker.track_violation(
-                    'oath_violations', violation_id, self.block, self.lot,
-                    violation.get('hearing_date')
-                )
-        
-        # Check DOB violations
-        dob_violations = self.data_fetcher.get_dob_violations(self.block, self.lot, yesterday)
-        for violation in dob_violations:
-            violation_id = violation.get('isn_dob_bis_viol')
-            if violation_id and self.tracker.is_new_violation('dob_violations', violation_id):
-                new_violations['dob_violations'].append(violation)
-                self.tracker.track_violation(
-                    'dob_violations', violation_id, self.block, self.lot,
-                    violation.get('issue_date')
-                )
-        
+
+        # Fetch and dedup all four sources concurrently
+        new_violations = asyncio.run(self._check_all(yesterday))
+
         # Log results
         total_new = sum(len(viol_list) for viol_list in new_violations.values())
         logger.info(f"Found {total_new} new violations")
@@ -326,6 +407,10 @@ class ViolationMonitor:
         # Send email notification
         self.notifier.send_violation_report(new_violations, self.block, self.lot)
 
+        # Persist the dedup set for the next run
+        if total_new:
+            self.tracker.flush()
+
 def main():
     """Main function"""
     try: